@@ -1,12 +1,20 @@
 from __future__ import annotations
 import os
-import io
+import csv
+import threading
+from collections.abc import Mapping
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import count
+from time import time_ns
+from types import MappingProxyType
 from datetime import datetime, date, time, timedelta
 from dateutil.relativedelta import relativedelta
 
 import pandas as pd
-from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, DateTime, Time, ForeignKey
-from sqlalchemy.sql import select, and_
+from sqlalchemy import create_engine, event, MetaData, Table, Column, Integer, String, DateTime, Time, ForeignKey, Index
+from sqlalchemy.sql import select, and_, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 import streamlit as st
 
 # Attempt to import the calendar component
@@ -30,7 +38,29 @@ os.makedirs(IMPORTS_DIR, exist_ok=True)
 # ----------------------
 # Database Setup (SQLite)
 # ----------------------
-engine = create_engine(f"sqlite:///{DB_PATH}", future=True)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-65536",      # 64 MB page cache
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",    # 256 MB
+)
+
+def _set_sqlite_pragmas(dbapi_conn, _record):
+    cur = dbapi_conn.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cur.execute(pragma)
+    cur.close()
+
+@st.cache_resource(show_spinner=False)
+def get_engine():
+    """One engine (and connection pool) per process, shared by every rerun and session."""
+    eng = create_engine(f"sqlite:///{DB_PATH}", future=True)
+    event.listen(eng, "connect", _set_sqlite_pragmas)
+    return eng
+
+engine = get_engine()
+
 metadata = MetaData()
 
 providers = Table(
@@ -55,6 +85,7 @@ credentials = Table(
     Column("id", Integer, primary_key=True, autoincrement=True),
     Column("provider_id", String, ForeignKey("providers.provider_id"), nullable=False),
     Column("client_id", String, ForeignKey("clients.client_id"), nullable=False),
+    Index("ix_credentials_pc", "provider_id", "client_id"),
 )
 
 shifts = Table(
@@ -66,10 +97,27 @@ shifts = Table(
     Column("end_datetime", DateTime, nullable=False),
     Column("shift_type", String, nullable=True),
     Column("notes", String, nullable=True),
+    Index("ix_shifts_start", "start_datetime"),
+    Index("ix_shifts_end", "end_datetime"),
+    # provider/client filters are always paired with a start-date range ordered by start
+    Index("ix_shifts_provider_start", "provider_id", "start_datetime"),
+    Index("ix_shifts_client_start", "client_id", "start_datetime"),
 )
 
-with engine.begin() as conn:
-    metadata.create_all(conn)
+TABLES = {t.name: t for t in (providers, clients, credentials, shifts)}
+
+@st.cache_resource(show_spinner=False)
+def init_schema() -> bool:
+    """Create tables and indexes once per process instead of probing the schema every rerun."""
+    with engine.begin() as conn:
+        metadata.create_all(conn)
+        # create_all() skips indexes on tables that already exist
+        for table in TABLES.values():
+            for ix in table.indexes:
+                ix.create(conn, checkfirst=True)
+    return True
+
+init_schema()
 
 # ----------------------
 # Brand Colors
@@ -87,6 +135,11 @@ def parse_time(t: str | time | None) -> time | None:
         return None
     if isinstance(t, time):
         return t
+    return _parse_time_str(t)
+
+@lru_cache(maxsize=1024)
+def _parse_time_str(t: str) -> time | None:
+    # Schedule strings repeat a lot (e.g. "08:00" on every imported provider); strptime each once
     for fmt in ("%H:%M", "%I:%M %p"):
         try:
             return datetime.strptime(t.strip(), fmt).time()
@@ -99,23 +152,171 @@ def month_range(year: int, month: int) -> tuple[date, date]:
     last = first + relativedelta(months=1) - timedelta(days=1)
     return first, last
 
-def df_from_table(conn, table: Table) -> pd.DataFrame:
-    rows = conn.execute(select(table)).mappings().all()
-    return pd.DataFrame(rows) if rows else pd.DataFrame(columns=[c.name for c in table.columns])
+def df_from_table(conn, table: Table, order_by=None) -> pd.DataFrame:
+    date_cols = [c.name for c in table.columns if isinstance(c.type, DateTime)]
+    stmt = select(table) if order_by is None else select(table).order_by(order_by)
+    return pd.read_sql_query(stmt, conn, parse_dates=date_cols or None)
+
+@st.cache_resource
+def table_versions() -> dict[str, int]:
+    """Process-wide write counters per table, shared by every session."""
+    return {name: 0 for name in TABLES}
+
+@st.cache_resource
+def _versions_lock() -> threading.Lock:
+    return threading.Lock()
+
+def bump_version(*names: str):
+    """Invalidate cached reads of the given tables; call only after the writing transaction has committed."""
+    versions = table_versions()
+    with _versions_lock():
+        for name in names:
+            versions[name] += 1
+
+# Bounded: every write leaves the previous version's entries behind and nothing else evicts them
+@st.cache_data(show_spinner=False, max_entries=8)
+def load_table(name: str, version: int) -> pd.DataFrame:
+    """Cached full-table read; `version` comes from table_versions() and only changes on writes."""
+    # Providers/clients come back name-sorted, so their selectboxes need no sort of their own
+    order_by = {"providers": providers.c.provider_name, "clients": clients.c.client_name}.get(name)
+    with engine.begin() as conn:
+        return df_from_table(conn, TABLES[name], order_by=order_by)
+
+def select_shifts_with_names():
+    """Base select: every shift column plus provider_name/client_name (NULL when the referenced row is gone)."""
+    return (
+        select(shifts, providers.c.provider_name, clients.c.client_name)
+        .select_from(shifts.outerjoin(providers, shifts.c.provider_id == providers.c.provider_id)
+                     .outerjoin(clients, shifts.c.client_id == clients.c.client_id))
+    )
+
+# Point lookups built once per run; call sites only bind :sid
+SHIFT_EDIT_FIELDS_BY_ID_STMT = select(
+    shifts.c.provider_id, shifts.c.client_id, shifts.c.start_datetime,
+    shifts.c.end_datetime, shifts.c.shift_type, shifts.c.notes,
+).where(shifts.c.shift_id == bindparam("sid"))
+SHIFT_WITH_NAMES_BY_ID_STMT = select_shifts_with_names().where(shifts.c.shift_id == bindparam("sid"))
+# Values are bound at execute time (executemany form), same path as the bulk imports
+CREDENTIAL_INSERT_STMT = credentials.insert()
+
+def load_shift_joined(conn, shift_id: str):
+    """One shift with its provider/client names in a single query, or None if it no longer exists."""
+    return conn.execute(SHIFT_WITH_NAMES_BY_ID_STMT, {"sid": shift_id}).mappings().first()
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def load_shifts_joined(version: tuple[int, ...], start: date | None = None, end: date | None = None,
+                       provider_id: str | None = None, client_id: str | None = None) -> pd.DataFrame:
+    """Shifts with provider/client names joined in SQL, optionally limited to a date range and one provider/client."""
+    q = select_shifts_with_names()
+    if start is not None:
+        q = q.where(shifts.c.start_datetime >= datetime.combine(start, time.min))
+    if end is not None:
+        q = q.where(shifts.c.end_datetime <= datetime.combine(end + timedelta(days=1), time.min))
+    if provider_id:
+        q = q.where(shifts.c.provider_id == provider_id)
+    if client_id:
+        q = q.where(shifts.c.client_id == client_id)
+    with engine.begin() as conn:
+        return pd.read_sql_query(q.order_by(shifts.c.start_datetime), conn, parse_dates=["start_datetime", "end_datetime"])
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def build_events(version: tuple[int, ...], provider_id: str | None = None, client_id: str | None = None) -> list[dict]:
+    """Calendar events for the all-time filtered shifts; rebuilt only when the filters or a write version change."""
+    ev = load_shifts_joined(version, provider_id=provider_id, client_id=client_id)
+    if ev.empty:
+        return []
+    stype = ev["shift_type"].fillna("").astype(str)
+    titles = ev["provider_name"].fillna("Unknown Provider") + " @ " + ev["client_name"].fillna("Unknown Client")
+    titles = titles.where(stype == "", titles + " (" + stype + ")")
+    duration_hours = (ev["end_datetime"] - ev["start_datetime"]).dt.total_seconds() / 3600.0
+    stype_lower = stype.str.lower()
+    # Lowest precedence first, so 24h call beats night beats day
+    colors = (
+        pd.Series(COLOR_DEFAULT, index=ev.index)
+        .mask(stype_lower.str.contains("day", regex=False), COLOR_DAY)
+        .mask(stype_lower.str.contains("night", regex=False), COLOR_NIGHT)
+        .mask((duration_hours - 24.0).abs() < 0.01, COLOR_CALL24)
+        .tolist()
+    )
+    notes = ev["notes"].astype(object).where(ev["notes"].notna(), None)
+    return [
+        {
+            "title": title,
+            "start": start_iso,
+            "end": end_iso,
+            "color": color,
+            "extendedProps": {"shift_id": sid, "provider_id": pid, "client_id": cid, "notes": note},
+        }
+        for title, start_iso, end_iso, color, sid, pid, cid, note in zip(
+            titles, ev["start_datetime"].dt.strftime("%Y-%m-%dT%H:%M:%S"), ev["end_datetime"].dt.strftime("%Y-%m-%dT%H:%M:%S"),
+            colors, ev["shift_id"], ev["provider_id"], ev["client_id"], notes,
+        )
+    ]
 
 def upsert(conn, table: Table, row: dict, key: str):
-    existing = conn.execute(select(table).where(table.c[key] == row[key])).mappings().first()
-    if existing:
-        conn.execute(table.update().where(table.c[key] == row[key]).values(**row))
-    else:
-        conn.execute(table.insert().values(**row))
+    stmt = sqlite_insert(table).values(**row)
+    stmt = stmt.on_conflict_do_update(index_elements=[key], set_={k: v for k, v in row.items() if k != key})
+    conn.execute(stmt)
+
+def bulk_upsert(conn, table: Table, rows: list[dict], key: str, batch_size: int = 1000):
+    """Upsert many rows with one executemany per batch instead of a statement per row."""
+    if not rows:
+        return
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(index_elements=[key], set_={k: stmt.excluded[k] for k in rows[0] if k != key})
+    for i in range(0, len(rows), batch_size):
+        conn.execute(stmt, rows[i:i + batch_size])
 
 def delete_by_id(conn, table: Table, key: str, value: str):
     conn.execute(table.delete().where(getattr(table.c, key) == value))
 
+@st.cache_resource(show_spinner=False)
+def _id_counter() -> tuple[count, threading.Lock]:
+    """Process-wide id counter; a module-level count() restarts at 0 on every rerun and in every session."""
+    return count(), threading.Lock()
+
 def generate_id(prefix: str) -> str:
-    ts = datetime.utcnow().strftime("%Y%m%d%H%M%S%f")
-    return f"{prefix}_{ts}"
+    # Nanosecond clock plus the process-wide counter, both hex: no strftime, and unique even
+    # when sessions share a clock tick
+    counter, lock = _id_counter()
+    with lock:
+        n = next(counter)
+    return f"{prefix}_{time_ns():x}_{n:x}"
+
+def generate_ids(prefix: str, n: int) -> list[str]:
+    # One clock read for the whole batch; the shared counter alone keeps the ids distinct
+    counter, lock = _id_counter()
+    with lock:
+        nums = [next(counter) for _ in range(n)]
+    stem = f"{prefix}_{time_ns():x}_"
+    return [f"{stem}{k:x}" for k in nums]
+
+@dataclass(frozen=True)
+class NameStore:
+    """Read-only provider/client name<->id lookups, built once per run instead of masking df_prov/df_cli."""
+    prov_name: Mapping[str, str]        # provider_id -> provider_name
+    cli_name: Mapping[str, str]         # client_id -> client_name
+    prov_id_by_name: Mapping[str, str]
+    cli_id_by_name: Mapping[str, str]
+    prov_index: Mapping[str, int]       # provider_id -> position in df_prov (selectbox index)
+    cli_index: Mapping[str, int]        # client_id -> position in df_cli
+    prov_options: tuple[str, ...]       # provider names in df_prov order (name-sorted), for selectboxes
+    cli_options: tuple[str, ...]
+
+    @classmethod
+    def from_frames(cls, df_prov: pd.DataFrame, df_cli: pd.DataFrame) -> "NameStore":
+        prov_ids, prov_names = df_prov["provider_id"].tolist(), df_prov["provider_name"].tolist()
+        cli_ids, cli_names = df_cli["client_id"].tolist(), df_cli["client_name"].tolist()
+        return cls(
+            prov_name=MappingProxyType(dict(zip(prov_ids, prov_names))),
+            cli_name=MappingProxyType(dict(zip(cli_ids, cli_names))),
+            prov_id_by_name=MappingProxyType(dict(zip(prov_names, prov_ids))),
+            cli_id_by_name=MappingProxyType(dict(zip(cli_names, cli_ids))),
+            prov_index=MappingProxyType({pid: i for i, pid in enumerate(prov_ids)}),
+            cli_index=MappingProxyType({cid: i for i, cid in enumerate(cli_ids)}),
+            prov_options=tuple(prov_names),
+            cli_options=tuple(cli_names),
+        )
 
 def reset_filters(jump_to_today: bool = False):
     """Safely reset provider/client filters and optionally jump to current month."""
@@ -129,10 +330,9 @@ def reset_filters(jump_to_today: bool = False):
 # ----------------------
 # Exporters
 # ----------------------
-def export_qgenda_csv(conn, start_dt: datetime, end_dt: datetime) -> str:
+def export_qgenda_csv(start_dt: datetime, end_dt: datetime) -> str:
     q = (
         select(
-            shifts.c.shift_id,
             shifts.c.provider_id,
             providers.c.provider_name,
             shifts.c.client_id,
@@ -148,72 +348,48 @@ def export_qgenda_csv(conn, start_dt: datetime, end_dt: datetime) -> str:
         .where(and_(shifts.c.start_datetime >= start_dt, shifts.c.end_datetime <= end_dt))
         .order_by(shifts.c.start_datetime)
     )
-    with engine.begin() as _conn:
-        df = pd.DataFrame(_conn.execute(q).mappings().all())
-    if df.empty:
-        df = pd.DataFrame(columns=[
+    out_path = os.path.join(EXPORTS_DIR, f"qgenda_export_{start_dt.date()}_to_{end_dt.date()}.csv")
+    # Write rows straight from the cursor; nothing is materialized beyond the current row
+    with engine.connect() as conn, open(out_path, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        # "\n" like the DataFrame.to_csv it replaced; csv's default is "\r\n"
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow([
             "ProviderID","ProviderName","ClientID","ClientName","Location",
             "StartDateTime","EndDateTime","ShiftType","Notes"
         ])
-    else:
-        df = df.rename(columns={
-            "provider_id": "ProviderID",
-            "provider_name": "ProviderName",
-            "client_id": "ClientID",
-            "client_name": "ClientName",
-            "location": "Location",
-            "start_datetime": "StartDateTime",
-            "end_datetime": "EndDateTime",
-            "shift_type": "ShiftType",
-            "notes": "Notes",
-        })[[
-            "ProviderID","ProviderName","ClientID","ClientName","Location",
-            "StartDateTime","EndDateTime","ShiftType","Notes"
-        ]]
-    out_path = os.path.join(EXPORTS_DIR, f"qgenda_export_{start_dt.date()}_to_{end_dt.date()}.csv")
-    if not df.empty:
-        for col in ["StartDateTime","EndDateTime"]:
-            df[col] = pd.to_datetime(df[col]).dt.strftime("%m/%d/%Y %H:%M")
-    df.to_csv(out_path, index=False)
+        for r in conn.execute(q):
+            writer.writerow((
+                r.provider_id, r.provider_name, r.client_id, r.client_name, r.location,
+                r.start_datetime.strftime("%m/%d/%Y %H:%M"), r.end_datetime.strftime("%m/%d/%Y %H:%M"),
+                r.shift_type, r.notes,
+            ))
     return out_path
 
+_TEMPLATE_BYTES = {
+    "providers": (
+        b"provider_id,provider_name,specialty,preferred_shift_start,preferred_shift_end,preferred_days\n"
+        b'P001,Dr. Alice Stone,Cardiology,08:00,16:00,"Mon,Tue,Wed"\n'
+    ),
+    "clients": (
+        b"client_id,client_name,location\n"
+        b'C001,Riverside Hospital,"Austin, TX"\n'
+    ),
+    "credentials": (
+        b"provider_id,client_id\n"
+        b"P001,C001\n"
+    ),
+    "shifts": (
+        b"shift_id,provider_id,client_id,start_datetime,end_datetime,shift_type,notes\n"
+        b"S001,P001,C001,2025-01-10 08:00,2025-01-10 16:00,Day,\n"
+    ),
+}
+
 def export_table_template(name: str) -> bytes:
-    templates = {
-        "providers": pd.DataFrame([
-            {
-                "provider_id": "P001",
-                "provider_name": "Dr. Alice Stone",
-                "specialty": "Cardiology",
-                "preferred_shift_start": "08:00",
-                "preferred_shift_end": "16:00",
-                "preferred_days": "Mon,Tue,Wed"
-            }
-        ]),
-        "clients": pd.DataFrame([
-            {"client_id": "C001", "client_name": "Riverside Hospital", "location": "Austin, TX"}
-        ]),
-        "credentials": pd.DataFrame([
-            {"provider_id": "P001", "client_id": "C001"}
-        ]),
-        "shifts": pd.DataFrame([
-            {
-                "shift_id": "S001",
-                "provider_id": "P001",
-                "client_id": "C001",
-                "start_datetime": "2025-01-10 08:00",
-                "end_datetime": "2025-01-10 16:00",
-                "shift_type": "Day",
-                "notes": ""
-            }
-        ]),
-    }
-    buf = io.StringIO()
-    templates[name].to_csv(buf, index=False)
-    return buf.getvalue().encode()
-
-
-
-def export_calendar_excel(conn, start_dt: datetime, end_dt: datetime) -> str:
+    return _TEMPLATE_BYTES[name]
+
+
+
+def export_calendar_excel(start_dt: datetime, end_dt: datetime) -> str:
     """Excel workbook with one sheet per month in range, listing calendar events."""
     # Pull shifts with joined names
     q = (
@@ -232,19 +408,16 @@ def export_calendar_excel(conn, start_dt: datetime, end_dt: datetime) -> str:
         .where(and_(shifts.c.start_datetime >= start_dt, shifts.c.end_datetime <= end_dt))
         .order_by(shifts.c.start_datetime)
     )
-    with engine.begin() as _conn:
-        df = pd.DataFrame(_conn.execute(q).mappings().all())
+    with engine.connect() as _conn:
+        df = pd.read_sql_query(q, _conn, parse_dates=["start_datetime", "end_datetime"])
     # Build Excel
     out_path = os.path.join(EXPORTS_DIR, f"calendar_{start_dt.date()}_to_{end_dt.date()}.xlsx")
     with pd.ExcelWriter(out_path, engine="xlsxwriter") as writer:
         if df.empty:
             pd.DataFrame(columns=["Date","Start","End","Provider","Client","Location","ShiftType","Notes"]).to_excel(writer, index=False, sheet_name="No Events")
         else:
-            df["Start"] = pd.to_datetime(df["start_datetime"])
-            df["End"] = pd.to_datetime(df["end_datetime"])
-            df["Date"] = df["Start"].dt.date
-            # Sort by start
-            df = df.sort_values("Start")
+            # Already datetime64 and ordered by start from the query
+            df = df.rename(columns={"start_datetime": "Start", "end_datetime": "End"})
             # group by month
             for (y, m), g in df.groupby([df["Start"].dt.year, df["Start"].dt.month]):
                 sheet = f"{y}-{m:02d}"
@@ -274,18 +447,9 @@ def export_calendar_visual_html(df_unused: pd.DataFrame, start_dt: datetime, end
     cli_name = st.session_state.get("cli_filter") if "cli_filter" in st.session_state else "(All)"
 
     # Query DB with overlap
-    with engine.begin() as _conn:
-        q = (
-            select(
-                shifts.c.shift_id,
-                shifts.c.provider_id,
-                shifts.c.client_id,
-                shifts.c.start_datetime,
-                shifts.c.end_datetime,
-                shifts.c.shift_type,
-                shifts.c.notes
-            )
-        )
+    with engine.connect() as _conn:
+        # Names come from the join, so the full providers/clients tables are not read
+        q = select_shifts_with_names()
         if prov_name and prov_name != "(All)":
             pid = _conn.execute(select(providers.c.provider_id).where(providers.c.provider_name == prov_name)).scalar()
             if pid:
@@ -295,25 +459,15 @@ def export_calendar_visual_html(df_unused: pd.DataFrame, start_dt: datetime, end
             if cid:
                 q = q.where(shifts.c.client_id == cid)
         q = q.where(and_(shifts.c.end_datetime >= start_dt, shifts.c.start_datetime <= end_dt)).order_by(shifts.c.start_datetime)
-        dd = pd.DataFrame(_conn.execute(q).mappings().all())
-
-        # name maps
-        dfp = pd.DataFrame(_conn.execute(select(providers)).mappings().all())
-        dfc = pd.DataFrame(_conn.execute(select(clients)).mappings().all())
-
-    pmap = {r["provider_id"]: r["provider_name"] for _, r in dfp.iterrows()} if not dfp.empty else {}
-    cmap = {r["client_id"]: r["client_name"] for _, r in dfc.iterrows()} if not dfc.empty else {}
+        dd = pd.read_sql_query(q, _conn, parse_dates=["start_datetime", "end_datetime"])
 
-    if dd.empty:
-        dd = pd.DataFrame(columns=["provider_id","client_id","start_datetime","end_datetime","shift_type","notes"])
-
-    dd["Start"] = pd.to_datetime(dd["start_datetime"])
-    dd["End"] = pd.to_datetime(dd["end_datetime"])
-    dd.sort_values("Start", inplace=True)
-    dd["Date"] = dd["Start"].dt.date
+    # read_sql_query keeps the columns (and parsed dtypes) even when no rows match
+    dd["Date"] = dd["start_datetime"].dt.date
+    dd["dur_h"] = (dd["end_datetime"] - dd["start_datetime"]).dt.total_seconds() / 3600.0
+    dd["title"] = dd["provider_name"].fillna("?") + " @ " + dd["client_name"].fillna("?")
 
     events_by_date = {}
-    for _, r in dd.iterrows():
+    for r in dd.to_dict("records"):
         d = r["Date"]
         events_by_date.setdefault(d, []).append(r)
 
@@ -392,9 +546,8 @@ def export_calendar_visual_html(df_unused: pd.DataFrame, start_dt: datetime, end
                     html.append(f"<div class='daynum'>{cell.day}</div>")
                     evs = events_by_date.get(cell, [])
                     for r in evs:
-                        title = f"{pmap.get(r['provider_id'],'?')} @ {cmap.get(r['client_id'],'?')}"
-                        label = title + (f" ({r['shift_type']})" if pd.notna(r.get('shift_type')) and str(r.get('shift_type')).strip() else "")
-                        dur_h = (pd.to_datetime(r['end_datetime']) - pd.to_datetime(r['start_datetime'])).total_seconds()/3600.0
+                        label = r['title'] + (f" ({r['shift_type']})" if pd.notna(r.get('shift_type')) and str(r.get('shift_type')).strip() else "")
+                        dur_h = r['dur_h']
                         cls = "event "
                         if abs(dur_h - 24.0) < 0.01:
                             cls += "call24"
@@ -415,7 +568,7 @@ def export_calendar_visual_html(df_unused: pd.DataFrame, start_dt: datetime, end
         f.write("".join(html))
     return out_path
 
-def export_calendar_ics(conn, start_dt: datetime, end_dt: datetime) -> str:
+def export_calendar_ics(start_dt: datetime, end_dt: datetime) -> str:
     """Generate an .ics calendar for the range that can be imported into most calendar apps."""
     q = (
         select(
@@ -432,12 +585,11 @@ def export_calendar_ics(conn, start_dt: datetime, end_dt: datetime) -> str:
         .where(and_(shifts.c.start_datetime >= start_dt, shifts.c.end_datetime <= end_dt))
         .order_by(shifts.c.start_datetime)
     )
-    with engine.begin() as _conn:
+    with engine.connect() as _conn:
         rows = _conn.execute(q).mappings().all()
-    def fmt_dt(dt: pd.Timestamp | datetime) -> str:
+    def fmt_dt(dt: datetime) -> str:
         # produce UTC-like floating time in basic format YYYYMMDDTHHMMSS
-        ts = pd.to_datetime(dt)
-        return ts.strftime("%Y%m%dT%H%M%S")
+        return dt.strftime("%Y%m%dT%H%M%S")
     ics_lines = [
         "BEGIN:VCALENDAR",
         "VERSION:2.0",
@@ -479,41 +631,26 @@ if 'clicked_shift' not in st.session_state:
     st.session_state.clicked_shift = None
 
 
-with engine.begin() as conn:
-    df_prov = df_from_table(conn, providers)
-    df_cli = df_from_table(conn, clients)
-    df_creds = df_from_table(conn, credentials)
-    df_shifts = df_from_table(conn, shifts)
-
-# Sidebar
-with st.sidebar:
-    st.subheader("Filters")
-    prov_filter = st.selectbox(
-        "Filter by Provider", options=["(All)"] + (sorted(df_prov["provider_name"].tolist()) if not df_prov.empty else []), key="prov_filter"
-    ) if not df_prov.empty else "(All)"
-    cli_filter = st.selectbox(
-        "Filter by Client", options=["(All)"] + (sorted(df_cli["client_name"].tolist()) if not df_cli.empty else []), key="cli_filter"
-    ) if not df_cli.empty else "(All)"
-
-    safe_mode = st.toggle("Safe mode: auto-fix filters", value=True, help="Prevents crashes if a filter choice no longer exists.")
+df_prov = load_table("providers", table_versions()["providers"])
+df_cli = load_table("clients", table_versions()["clients"])
+df_creds = load_table("credentials", table_versions()["credentials"])
+df_shifts = load_table("shifts", table_versions()["shifts"])
 
-    if st.button("Clear provider/client filters"):
-        st.session_state.pop('prov_filter', None)
-        st.session_state.pop('cli_filter', None)
-        st.rerun()
+names = NameStore.from_frames(df_prov, df_cli)
 
-    st.markdown("---")
-    st.subheader("Quick Add Shift")
+@st.fragment
+def quick_add_shift():
+    """Quick-add form; only a successful submit reruns the whole app."""
     with st.form("quick_add_shift_sidebar"):
         provider_id = None
         client_id = None
         if df_prov.empty or df_cli.empty:
             st.info("Add providers and clients first in their tabs below.")
         else:
-            prov_name = st.selectbox("Provider", options=df_prov["provider_name"].tolist())
-            provider_id = df_prov.loc[df_prov["provider_name"] == prov_name, "provider_id"].iloc[0]
-            cli_name = st.selectbox("Client", options=df_cli["client_name"].tolist())
-            client_id = df_cli.loc[df_cli["client_name"] == cli_name, "client_id"].iloc[0]
+            prov_name = st.selectbox("Provider", options=names.prov_options)
+            provider_id = names.prov_id_by_name[prov_name]
+            cli_name = st.selectbox("Client", options=names.cli_options)
+            client_id = names.cli_id_by_name[cli_name]
 
         shift_date = st.date_input("Date", value=date.today())
         start_t = st.time_input("Start", value=time(8, 0))
@@ -536,79 +673,51 @@ with st.sidebar:
                     "shift_type": shift_type,
                     "notes": notes,
                 }, key="shift_id")
+            bump_version("shifts")
             st.success("Shift added.")
             st.rerun()
 
-    st.markdown("---")
-    st.subheader("Quick Add Shift")
-    with st.form("quick_add_shift_main"):
-        provider_id = None
-        client_id = None
-        if df_prov.empty or df_cli.empty:
-            st.info("Add providers and clients first in their tabs below.")
-        else:
-            prov_name = st.selectbox("Provider", options=df_prov["provider_name"].tolist())
-            provider_id = df_prov.loc[df_prov["provider_name"] == prov_name, "provider_id"].iloc[0]
-            cli_name = st.selectbox("Client", options=df_cli["client_name"].tolist())
-            client_id = df_cli.loc[df_cli["client_name"] == cli_name, "client_id"].iloc[0]
 
-        shift_date = st.date_input("Date", value=date.today())
-        start_t = st.time_input("Start", value=time(8, 0))
-        is_24h = st.checkbox("24-hour call shift", value=False, help="Ends 24 hours after start (next day).")
-        end_t = st.time_input("End", value=time(16, 0), disabled=is_24h)
-        shift_type = st.text_input("Shift Type", value="Call (24h)" if is_24h else "Day")
-        notes = st.text_input("Notes", value="")
-        submitted = st.form_submit_button("Add Shift")
-        if submitted and provider_id and client_id:
-            with engine.begin() as conn:
-                sid = generate_id("S")
-                start_dt = datetime.combine(shift_date, start_t)
-                end_dt = start_dt + timedelta(hours=24) if is_24h else datetime.combine(shift_date, end_t)
-                upsert(conn, shifts, {
-                    "shift_id": sid,
-                    "provider_id": provider_id,
-                    "client_id": client_id,
-                    "start_datetime": start_dt,
-                    "end_datetime": end_dt,
-                    "shift_type": shift_type,
-                    "notes": notes,
-                }, key="shift_id")
-            st.success("Shift added.")
-            st.rerun()
+# Sidebar
+with st.sidebar:
+    st.subheader("Filters")
+    prov_filter = st.selectbox(
+        "Filter by Provider", options=("(All)",) + names.prov_options, key="prov_filter"
+    ) if not df_prov.empty else "(All)"
+    cli_filter = st.selectbox(
+        "Filter by Client", options=("(All)",) + names.cli_options, key="cli_filter"
+    ) if not df_cli.empty else "(All)"
 
-# Reload after writes
-with engine.begin() as conn:
-    df_prov = df_from_table(conn, providers)
-    df_cli = df_from_table(conn, clients)
-    df_creds = df_from_table(conn, credentials)
-    df_shifts = df_from_table(conn, shifts)
+    safe_mode = st.toggle("Safe mode: auto-fix filters", value=True, help="Prevents crashes if a filter choice no longer exists.")
 
-# Build filtered sets
-first_day, last_day = month_range(date.today().year, date.today().month)
+    if st.button("Clear provider/client filters"):
+        st.session_state.pop('prov_filter', None)
+        st.session_state.pop('cli_filter', None)
+        st.rerun()
 
-df_shifts_all = df_shifts.copy()
-df_shifts_filtered = df_shifts_all.copy()
+    st.markdown("---")
+    st.subheader("Quick Add Shift")
+    quick_add_shift()
 
-if prov_filter != "(All)" and not df_prov.empty and (df_prov["provider_name"] == prov_filter).any():
-    pid = df_prov.loc[df_prov["provider_name"] == prov_filter, "provider_id"].iloc[0]
-    df_shifts_filtered = df_shifts_filtered[df_shifts_filtered["provider_id"] == pid]
+# Build filtered sets
+first_day, last_day = month_range(date.today().year, date.today().month)
 
-if cli_filter != "(All)" and not df_cli.empty and (df_cli["client_name"] == cli_filter).any():
-    cid = df_cli.loc[df_cli["client_name"] == cli_filter, "client_id"].iloc[0]
-    df_shifts_filtered = df_shifts_filtered[df_shifts_filtered["client_id"] == cid]
+# "(All)" or a stale name both resolve to None
+prov_filter_id = names.prov_id_by_name.get(prov_filter)
+cli_filter_id = names.cli_id_by_name.get(cli_filter)
 
-df_shifts_month = df_shifts_filtered[
-    (df_shifts_filtered["start_datetime"] >= pd.Timestamp(first_day)) &
-    (df_shifts_filtered["end_datetime"] <= pd.Timestamp(last_day) + pd.Timedelta(days=1))
-] if not df_shifts_filtered.empty else df_shifts_filtered.copy()
+_ver = table_versions()
+shift_versions = (_ver["shifts"], _ver["providers"], _ver["clients"])
+df_shifts_filtered = load_shifts_joined(shift_versions, provider_id=prov_filter_id, client_id=cli_filter_id)
+df_shifts_month = load_shifts_joined(shift_versions, first_day, last_day, prov_filter_id, cli_filter_id)
 
 # Auto-fix broken filters
 if safe_mode:
-    if prov_filter != "(All)" and (df_prov.empty or not (df_prov["provider_name"] == prov_filter).any()):
+    if prov_filter != "(All)" and prov_filter not in names.prov_id_by_name:
         st.info("Provider filter was invalid and has been reset to (All).")
         reset_filters(jump_to_today=False)
         st.rerun()
-    if cli_filter != "(All)" and (df_cli.empty or not (df_cli["client_name"] == cli_filter).any()):
+    if cli_filter != "(All)" and cli_filter not in names.cli_id_by_name:
         st.info("Client filter was invalid and has been reset to (All).")
         reset_filters(jump_to_today=False)
         st.rerun()
@@ -618,40 +727,124 @@ tab_calendar, tab_shifts_table, tab_bulk, tab_providers, tab_clients, tab_creden
     "📅 Calendar", "📋 Shifts (Table)", "🧰 Bulk Add", "👩‍⚕️ Providers", "🏥 Clients", "🔐 Credentials", "⬆️⬇️ Upload/Download", "⚙️ Settings"
 ])
 
+@st.dialog("Shift editor", width="large")
+def shift_editor(events: list[dict]):
+    """Shift editor dialog; its widget interactions rerun only the dialog."""
+    cs = st.session_state.get("clicked_shift")
+    # If no clicked shift, let user choose one from events
+    if not cs:
+        if not events:
+            st.info("No shifts to edit in the current filters.")
+            if st.button("Close"):
+                st.session_state.show_shift_modal = False
+                st.rerun()
+        else:
+            labels = []
+            id_by_label = {}
+            for e in events:
+                s_val = datetime.fromisoformat(e["start"]).strftime("%m/%d/%Y %H:%M")
+                e_val = datetime.fromisoformat(e["end"]).strftime("%m/%d/%Y %H:%M")
+                title = e.get("title","")
+                label = f"{s_val} → {e_val} | {title} [{e['extendedProps']['shift_id']}]"
+                labels.append(label)
+                id_by_label[label] = e["extendedProps"]["shift_id"]
+            pick = st.selectbox("Select a shift", options=labels, key="modal_pick_shift")
+            if st.button("Open selected"):
+                st.session_state.clicked_shift = {"shift_id": id_by_label[pick]}
+                # Stay in the dialog; a full rerun would close it
+                st.rerun(scope="fragment")
+    # Render editor if shift selected
+    cs = st.session_state.get("clicked_shift")
+    if cs and cs.get("shift_id"):
+        with engine.begin() as conn:
+            row = load_shift_joined(conn, cs["shift_id"])
+        if row is None:
+            st.warning("This shift no longer exists.")
+            if st.button("Close"):
+                st.session_state.show_shift_modal = False
+                st.rerun()
+        else:
+            st.write("**Shift ID:**", row["shift_id"], "—", f"{row['provider_name'] or 'Unknown Provider'} @ {row['client_name'] or 'Unknown Client'}")
+            c1, c2 = st.columns(2)
+            with c1:
+                prov_options = names.prov_options or ("(none)",)
+                prov_index = names.prov_index.get(row["provider_id"], 0)
+                prov_name_edit = st.selectbox("Provider", options=prov_options, index=min(prov_index, max(len(prov_options)-1,0)))
+            with c2:
+                cli_options = names.cli_options or ("(none)",)
+                cli_index = names.cli_index.get(row["client_id"], 0)
+                cli_name_edit = st.selectbox("Client", options=cli_options, index=min(cli_index, max(len(cli_options)-1,0)))
+
+            start_val = row["start_datetime"]
+            end_val = row["end_datetime"]
+            is_24h_default = end_val - start_val == timedelta(hours=24)
+
+            c3, c4 = st.columns(2)
+            with c3:
+                start_date_edit = st.date_input("Start Date", value=start_val.date(), key=f"md_{row['shift_id']}_sd")
+                start_time_edit = st.time_input("Start Time", value=start_val.time(), key=f"md_{row['shift_id']}_st")
+            with c4:
+                is_24h_edit = st.checkbox("24-hour call shift", value=is_24h_default, key=f"md_{row['shift_id']}_24")
+                end_date_edit = st.date_input("End Date", value=end_val.date(), disabled=is_24h_edit, key=f"md_{row['shift_id']}_ed")
+                end_time_edit = st.time_input("End Time", value=end_val.time(), disabled=is_24h_edit, key=f"md_{row['shift_id']}_et")
+
+            shift_type_edit = st.text_input("Shift Type", value=row.get("shift_type") or "Day", key=f"md_{row['shift_id']}_type")
+            notes_edit = st.text_input("Notes", value=row.get("notes") or "", key=f"md_{row['shift_id']}_notes")
+
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                save = st.button("Save changes")
+            with col2:
+                dup = st.button("Duplicate")
+            with col3:
+                delete = st.button("Delete")
+            with col4:
+                close = st.button("Close")
+
+            if delete:
+                with engine.begin() as conn:
+                    delete_by_id(conn, shifts, "shift_id", row["shift_id"])
+                bump_version("shifts")
+                st.success("Deleted shift.")
+                st.session_state.show_shift_modal = False
+                st.rerun()
+
+            if save or dup:
+                new_prov_id = names.prov_id_by_name.get(prov_name_edit, row["provider_id"])
+                new_cli_id = names.cli_id_by_name.get(cli_name_edit, row["client_id"])
+                start_dt_new = datetime.combine(start_date_edit, start_time_edit)
+                if is_24h_edit:
+                    end_dt_new = start_dt_new + timedelta(hours=24)
+                else:
+                    end_dt_new = datetime.combine(end_date_edit, end_time_edit)
+
+                new_row = {
+                    "shift_id": row["shift_id"] if save else generate_id("S"),
+                    "provider_id": new_prov_id,
+                    "client_id": new_cli_id,
+                    "start_datetime": start_dt_new,
+                    "end_datetime": end_dt_new,
+                    "shift_type": shift_type_edit,
+                    "notes": notes_edit,
+                }
+                with engine.begin() as conn:
+                    upsert(conn, shifts, new_row, key="shift_id")
+                bump_version("shifts")
+                st.success("Saved." if save else "Duplicated.")
+                st.session_state.show_shift_modal = False
+                st.rerun()
+
+            if close:
+                st.session_state.show_shift_modal = False
+                st.rerun()
+
+
 # Calendar
 with tab_calendar:
     st.subheader("Monthly View")
 
     # Build events from ALL-TIME filtered shifts
-    events = []
-    if not df_shifts_filtered.empty:
-        pmap = {r["provider_id"]: r["provider_name"] for _, r in df_prov.iterrows()} if not df_prov.empty else {}
-        cmap = {r["client_id"]: r["client_name"] for _, r in df_cli.iterrows()} if not df_cli.empty else {}
-        for _, r in df_shifts_filtered.iterrows():
-            prov_name = pmap.get(r["provider_id"], "Unknown Provider")
-            cli_name = cmap.get(r["client_id"], "Unknown Client")
-            title = f"{prov_name} @ {cli_name} ({r['shift_type']})" if r.get("shift_type") else f"{prov_name} @ {cli_name}"
-            duration_hours = (pd.to_datetime(r["end_datetime"]) - pd.to_datetime(r["start_datetime"])).total_seconds() / 3600.0
-            if abs(duration_hours - 24.0) < 0.01:
-                color = COLOR_CALL24
-            elif isinstance(r.get("shift_type"), str) and "night" in r.get("shift_type","").lower():
-                color = COLOR_NIGHT
-            elif isinstance(r.get("shift_type"), str) and "day" in r.get("shift_type","").lower():
-                color = COLOR_DAY
-            else:
-                color = COLOR_DEFAULT
-            events.append({
-                "title": title,
-                "start": pd.to_datetime(r["start_datetime"]).isoformat(),
-                "end": pd.to_datetime(r["end_datetime"]).isoformat(),
-                "color": color,
-                "extendedProps": {
-                    "shift_id": r["shift_id"],
-                    "provider_id": r["provider_id"],
-                    "client_id": r["client_id"],
-                    "notes": r.get("notes", "")
-                }
-            })
+    events = build_events(shift_versions, prov_filter_id, cli_filter_id)
 
     if CAL_AVAILABLE:
         cal_options = {
@@ -668,27 +861,18 @@ with tab_calendar:
             cal_state = st_calendar(events=events, options=cal_options, key="main_calendar")
 
             # Legend
-            st.markdown("**Legend**")
-            lc1, lc2, lc3, lc4 = st.columns(4)
-            with lc1:
-                st.markdown(f'<div style="display:flex;align-items:center;"><span style="width:14px;height:14px;background:{COLOR_DEFAULT};display:inline-block;margin-right:8px;border-radius:3px;"></span>Other</div>', unsafe_allow_html=True)
-            with lc2:
-                st.markdown(f'<div style="display:flex;align-items:center;"><span style="width:14px;height:14px;background:{COLOR_DAY};display:inline-block;margin-right:8px;border-radius:3px;"></span>Day</div>', unsafe_allow_html=True)
-            with lc3:
-                st.markdown(f'<div style="display:flex;align-items:center;"><span style="width:14px;height:14px;background:{COLOR_NIGHT};display:inline-block;margin-right:8px;border-radius:3px;"></span>Night</div>', unsafe_allow_html=True)
-            with lc4:
-                st.markdown(f'<div style="display:flex;align-items:center;"><span style="width:14px;height:14px;background:{COLOR_CALL24};display:inline-block;margin-right:8px;border-radius:3px;"></span>24h Call</div>', unsafe_allow_html=True)
+            legend_items = "".join(
+                f'<div style="display:flex;align-items:center;flex:1;"><span style="width:14px;height:14px;background:{color};display:inline-block;margin-right:8px;border-radius:3px;"></span>{label}</div>'
+                for color, label in ((COLOR_DEFAULT, "Other"), (COLOR_DAY, "Day"), (COLOR_NIGHT, "Night"), (COLOR_CALL24, "24h Call"))
+            )
+            st.markdown(f'<p><strong>Legend</strong></p><div style="display:flex;">{legend_items}</div>', unsafe_allow_html=True)
 
             # Compact trigger button to open modal editor (works even if clicks are blocked)
-            top_c1, top_c2 = st.columns([1,6])
-            with top_c1:
-                if st.button("📝 Edit shift…", help="Open shift editor", key="open_shift_modal_btn"):
-                    st.session_state.show_shift_modal = True
-                    if not st.session_state.get("clicked_shift"):
-                        st.session_state.clicked_shift = None
-                    st.rerun()
-            with top_c2:
-                pass
+            if st.button("📝 Edit shift…", help="Open shift editor", key="open_shift_modal_btn"):
+                st.session_state.show_shift_modal = True
+                if not st.session_state.get("clicked_shift"):
+                    st.session_state.clicked_shift = None
+                st.rerun()
 
             # Handle click -> open modal
             if cal_state and cal_state.get("clickedEvent"):
@@ -707,125 +891,22 @@ with tab_calendar:
             else:
                 st.info("Tip: click a calendar event to edit it. If clicking doesn't open a form, use the 📝 button above or the Shifts (Table) tab.")
 
-            # Modal editor
+            # Shift editor
             if st.session_state.get("show_shift_modal"):
-                cs = st.session_state.get("clicked_shift")
-                with st.modal("Shift editor"):
-                    # If no clicked shift, let user choose one from events
-                    if not cs:
-                        if not events:
-                            st.info("No shifts to edit in the current filters.")
-                            if st.button("Close"):
-                                st.session_state.show_shift_modal = False
-                                st.rerun()
-                        else:
-                            labels = []
-                            id_by_label = {}
-                            for e in events:
-                                s_val = pd.to_datetime(e["start"]).strftime("%m/%d/%Y %H:%M")
-                                e_val = pd.to_datetime(e["end"]).strftime("%m/%d/%Y %H:%M")
-                                title = e.get("title","")
-                                label = f"{s_val} → {e_val} | {title} [{e['extendedProps']['shift_id']}]"
-                                labels.append(label)
-                                id_by_label[label] = e["extendedProps"]["shift_id"]
-                            pick = st.selectbox("Select a shift", options=labels, key="modal_pick_shift")
-                            if st.button("Open selected"):
-                                st.session_state.clicked_shift = {"shift_id": id_by_label[pick]}
-                                st.rerun()
-                    # Render editor if shift selected
-                    cs = st.session_state.get("clicked_shift")
-                    if cs and cs.get("shift_id"):
-                        with engine.begin() as conn:
-                            row = conn.execute(select(shifts).where(shifts.c.shift_id == cs["shift_id"])).mappings().first()
-                        if row is None:
-                            st.warning("This shift no longer exists.")
-                            if st.button("Close"):
-                                st.session_state.show_shift_modal = False
-                                st.rerun()
-                        else:
-                            st.write("**Shift ID:**", row["shift_id"])
-                            c1, c2 = st.columns(2)
-                            with c1:
-                                prov_options = df_prov["provider_name"].tolist() if not df_prov.empty else ["(none)"]
-                                prov_index = 0
-                                if not df_prov.empty and (df_prov["provider_id"] == row["provider_id"]).any():
-                                    prov_index = int(df_prov.index[df_prov["provider_id"]==row["provider_id"]][0])
-                                prov_name_edit = st.selectbox("Provider", options=prov_options, index=min(prov_index, max(len(prov_options)-1,0)))
-                            with c2:
-                                cli_options = df_cli["client_name"].tolist() if not df_cli.empty else ["(none)"]
-                                cli_index = 0
-                                if not df_cli.empty and (df_cli["client_id"] == row["client_id"]).any():
-                                    cli_index = int(df_cli.index[df_cli["client_id"]==row["client_id"]][0])
-                                cli_name_edit = st.selectbox("Client", options=cli_options, index=min(cli_index, max(len(cli_options)-1,0)))
-
-                            start_val = pd.to_datetime(row["start_datetime"]).to_pydatetime()
-                            end_val = pd.to_datetime(row["end_datetime"]).to_pydatetime()
-
-                            c3, c4 = st.columns(2)
-                            with c3:
-                                start_date_edit = st.date_input("Start Date", value=start_val.date(), key=f"md_{row['shift_id']}_sd")
-                                start_time_edit = st.time_input("Start Time", value=start_val.time(), key=f"md_{row['shift_id']}_st")
-                            with c4:
-                                is_24h_edit = st.checkbox("24-hour call shift", value=(end_val - start_val).total_seconds() == 24*3600, key=f"md_{row['shift_id']}_24")
-                                end_date_edit = st.date_input("End Date", value=end_val.date(), disabled=is_24h_edit, key=f"md_{row['shift_id']}_ed")
-                                end_time_edit = st.time_input("End Time", value=end_val.time(), disabled=is_24h_edit, key=f"md_{row['shift_id']}_et")
-
-                            shift_type_edit = st.text_input("Shift Type", value=row.get("shift_type") or "Day", key=f"md_{row['shift_id']}_type")
-                            notes_edit = st.text_input("Notes", value=row.get("notes") or "", key=f"md_{row['shift_id']}_notes")
-
-                            col1, col2, col3, col4 = st.columns(4)
-                            with col1:
-                                save = st.button("Save changes")
-                            with col2:
-                                dup = st.button("Duplicate")
-                            with col3:
-                                delete = st.button("Delete")
-                            with col4:
-                                close = st.button("Close")
-
-                            if delete:
-                                with engine.begin() as conn:
-                                    delete_by_id(conn, shifts, "shift_id", row["shift_id"])
-                                st.success("Deleted shift.")
-                                st.session_state.show_shift_modal = False
-                                st.rerun()
-
-                            if save or dup:
-                                new_prov_id = df_prov.loc[df_prov["provider_name"] == prov_name_edit, "provider_id"].iloc[0] if prov_name_edit in (df_prov["provider_name"].tolist() if not df_prov.empty else []) else row["provider_id"]
-                                new_cli_id = df_cli.loc[df_cli["client_name"] == cli_name_edit, "client_id"].iloc[0] if cli_name_edit in (df_cli["client_name"].tolist() if not df_cli.empty else []) else row["client_id"]
-                                start_dt_new = datetime.combine(start_date_edit, start_time_edit)
-                                if is_24h_edit:
-                                    end_dt_new = start_dt_new + timedelta(hours=24)
-                                else:
-                                    end_dt_new = datetime.combine(end_date_edit, end_time_edit)
-
-                                new_row = {
-                                    "shift_id": row["shift_id"] if save else generate_id("S"),
-                                    "provider_id": new_prov_id,
-                                    "client_id": new_cli_id,
-                                    "start_datetime": start_dt_new,
-                                    "end_datetime": end_dt_new,
-                                    "shift_type": shift_type_edit,
-                                    "notes": notes_edit,
-                                }
-                                with engine.begin() as conn:
-                                    upsert(conn, shifts, new_row, key="shift_id")
-                                st.success("Saved." if save else "Duplicated.")
-                                st.session_state.show_shift_modal = False
-                                st.rerun()
-
-                            if close:
-                                st.session_state.show_shift_modal = False
-                                st.rerun()
+                # Consume the flag: the dialog reruns on its own, and dismissing it with X must not reopen it
+                st.session_state.show_shift_modal = False
+                shift_editor(events)
     else:
         st.warning("Calendar component not available — showing simple month table.")
-        days = pd.date_range(first_day, last_day, freq="D")
-        table = pd.DataFrame(index=[d.date() for d in days], columns=["Shifts"]).fillna("")
-        for _, r in df_shifts_filtered.iterrows():
-            d = pd.to_datetime(r["start_datetime"]).date()
-            prov_name = df_prov.loc[df_prov["provider_id"] == r["provider_id"], "provider_name"].iloc[0] if not df_prov.empty else "Unknown"
-            cli_name = df_cli.loc[df_cli["client_id"] == r["client_id"], "client_name"].iloc[0] if not df_cli.empty else "Unknown"
-            table.at[d, "Shifts"] += f"• {prov_name} @ {cli_name} ({r.get('shift_type','')})\n"
+        days = pd.date_range(first_day, last_day, freq="D").date
+        lines = (
+            "• " + df_shifts_filtered["provider_name"].fillna("Unknown")
+            + " @ " + df_shifts_filtered["client_name"].fillna("Unknown")
+            + " (" + df_shifts_filtered["shift_type"].fillna("") + ")"
+        )
+        by_day = lines.groupby(df_shifts_filtered["start_datetime"].dt.date).agg("\n".join)
+        # The grouper names the index "start_datetime"; the table shows days without a header
+        table = by_day.reindex(days, fill_value="").rename_axis(None).to_frame("Shifts")
         st.dataframe(table, use_container_width=True, height=600)
 
     st.markdown("---")
@@ -841,7 +922,7 @@ with tab_calendar:
             if (exp_end - exp_start).days > 366:
                 st.error("Please select a range of 366 days or less.")
             else:
-                path = export_qgenda_csv(engine.begin(), datetime.combine(exp_start, time.min), datetime.combine(exp_end, time.max))
+                path = export_qgenda_csv(datetime.combine(exp_start, time.min), datetime.combine(exp_end, time.max))
                 st.success(f"Exported to {path}")
                 with open(path, "rb") as f:
                     st.download_button("Download CSV", f, file_name=os.path.basename(path), mime="text/csv")
@@ -852,7 +933,7 @@ with tab_calendar:
             if (exp_end - exp_start).days > 366:
                 st.error("Please select a range of 366 days or less.")
             else:
-                path_xlsx = export_calendar_excel(engine.begin(), datetime.combine(exp_start, time.min), datetime.combine(exp_end, time.max))
+                path_xlsx = export_calendar_excel(datetime.combine(exp_start, time.min), datetime.combine(exp_end, time.max))
                 st.success(f"Exported to {path_xlsx}")
                 with open(path_xlsx, "rb") as f:
                     st.download_button("Download Excel", f, file_name=os.path.basename(path_xlsx), mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
@@ -861,7 +942,7 @@ with tab_calendar:
             if (exp_end - exp_start).days > 366:
                 st.error("Please select a range of 366 days or less.")
             else:
-                path_ics = export_calendar_ics(engine.begin(), datetime.combine(exp_start, time.min), datetime.combine(exp_end, time.max))
+                path_ics = export_calendar_ics(datetime.combine(exp_start, time.min), datetime.combine(exp_end, time.max))
                 st.success(f"Exported to {path_ics}")
                 with open(path_ics, "rb") as f:
                     st.download_button("Download ICS", f, file_name=os.path.basename(path_ics), mime="text/calendar")
@@ -882,29 +963,32 @@ with tab_calendar:
 with tab_shifts_table:
     st.subheader("Shifts — All Time (filtered by Provider/Client)")
     with st.expander("Filters", expanded=True):
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            date_filter_on = st.checkbox("Filter by date range", value=False, key="tbl_date_on")
-            date_from = st.date_input("From", value=first_day, key="tbl_from")
-        with c2:
-            date_to = st.date_input("To", value=last_day, key="tbl_to")
-            only_24h = st.checkbox("Only 24-hour shifts", value=False, key="tbl_24")
-        with c3:
-            provider_multi = st.multiselect("Providers", options=(df_prov["provider_name"].tolist() if not df_prov.empty else []), key="tbl_prov")
-            client_multi = st.multiselect("Clients", options=(df_cli["client_name"].tolist() if not df_cli.empty else []), key="tbl_cli")
-            type_contains = st.text_input("Shift type contains", value="", key="tbl_type_like")
+        # Batch filter edits into one rerun per "Apply filters" click
+        with st.form("tbl_filters"):
+            c1, c2, c3 = st.columns(3)
+            with c1:
+                date_filter_on = st.checkbox("Filter by date range", value=False, key="tbl_date_on")
+                date_from = st.date_input("From", value=first_day, key="tbl_from")
+            with c2:
+                date_to = st.date_input("To", value=last_day, key="tbl_to")
+                only_24h = st.checkbox("Only 24-hour shifts", value=False, key="tbl_24")
+            with c3:
+                provider_multi = st.multiselect("Providers", options=names.prov_options, key="tbl_prov")
+                client_multi = st.multiselect("Clients", options=names.cli_options, key="tbl_cli")
+                type_contains = st.text_input("Shift type contains", value="", key="tbl_type_like")
+            st.form_submit_button("Apply filters")
 
     tbl_df = df_shifts_filtered.copy()
     if date_filter_on and not tbl_df.empty:
         tbl_df = tbl_df[(tbl_df["start_datetime"] >= pd.Timestamp(date_from)) & (tbl_df["end_datetime"] <= pd.Timestamp(date_to) + pd.Timedelta(days=1))]
     if only_24h and not tbl_df.empty:
-        dur = (pd.to_datetime(tbl_df["end_datetime"]) - pd.to_datetime(tbl_df["start_datetime"])).dt.total_seconds() / 3600.0
+        dur = (tbl_df["end_datetime"] - tbl_df["start_datetime"]).dt.total_seconds() / 3600.0
         tbl_df = tbl_df[abs(dur - 24.0) < 0.01]
     if provider_multi and not tbl_df.empty:
-        pids = df_prov[df_prov["provider_name"].isin(provider_multi)]["provider_id"].tolist()
+        pids = [names.prov_id_by_name[n] for n in provider_multi]
         tbl_df = tbl_df[tbl_df["provider_id"].isin(pids)]
     if client_multi and not tbl_df.empty:
-        cids = df_cli[df_cli["client_name"].isin(client_multi)]["client_id"].tolist()
+        cids = [names.cli_id_by_name[n] for n in client_multi]
         tbl_df = tbl_df[tbl_df["client_id"].isin(cids)]
     if type_contains and not tbl_df.empty:
         tbl_df = tbl_df[tbl_df["shift_type"].fillna("").str.contains(type_contains, case=False, na=False)]
@@ -914,14 +998,17 @@ with tab_shifts_table:
     def attach_names(df):
         if df.empty:
             return df
-        pmap = {r["provider_id"]: r["provider_name"] for _, r in df_prov.iterrows()} if not df_prov.empty else {}
-        cmap = {r["client_id"]: r["client_name"] for _, r in df_cli.iterrows()} if not df_cli.empty else {}
-        out = df.copy()
-        out["Provider"] = out["provider_id"].map(pmap)
-        out["Client"] = out["client_id"].map(cmap)
-        out["Start"] = pd.to_datetime(out["start_datetime"]).dt.strftime("%m/%d/%Y %H:%M")
-        out["End"] = pd.to_datetime(out["end_datetime"]).dt.strftime("%m/%d/%Y %H:%M")
-        return out[["shift_id","Provider","Client","Start","End","shift_type","notes"]]
+        # provider_name/client_name already come joined from load_shifts_joined();
+        # build only the displayed columns instead of copying the whole frame first
+        return pd.DataFrame({
+            "shift_id": df["shift_id"],
+            "Provider": df["provider_name"],
+            "Client": df["client_name"],
+            "Start": df["start_datetime"].dt.strftime("%m/%d/%Y %H:%M"),
+            "End": df["end_datetime"].dt.strftime("%m/%d/%Y %H:%M"),
+            "shift_type": df["shift_type"],
+            "notes": df["notes"],
+        }, copy=False)
 
     table_df = attach_names((df_shifts_month if limit_to_month else tbl_df))
     st.dataframe(table_df, use_container_width=True, hide_index=True)
@@ -929,39 +1016,50 @@ with tab_shifts_table:
 
     # Inline editor
     if not table_df.empty:
-        options = []
-        for _, r in table_df.iterrows():
-            label = f"{r['Start']} → {r['End']} | {r['Provider']} @ {r['Client']} | {r['shift_type']} [{r['shift_id']}]"
-            options.append((label, r["shift_id"]))
-        labels = [o[0] for o in options]
-        ids = {o[0]: o[1] for o in options}
+        ids = {
+            f"{start} → {end} | {prov} @ {cli} | {stype} [{sid}]": sid
+            for sid, prov, cli, start, end, stype in zip(
+                table_df["shift_id"], table_df["Provider"], table_df["Client"],
+                table_df["Start"], table_df["End"], table_df["shift_type"],
+            )
+        }
+        labels = list(ids)
 
         selected_label = st.selectbox("Select a shift to edit", options=labels, key="table_editor_select")
         selected_id = ids[selected_label]
 
-        with engine.begin() as conn:
-            row = conn.execute(select(shifts).where(shifts.c.shift_id == selected_id)).mappings().first()
+        # Re-read the row only when the selection changes or shifts were written since
+        row_key = (selected_id, table_versions()["shifts"])
+        cached = st.session_state.get("table_editor_row")
+        if cached is not None and cached[0] == row_key:
+            row = cached[1]
+        else:
+            with engine.connect() as conn:
+                row = conn.execute(SHIFT_EDIT_FIELDS_BY_ID_STMT, {"sid": selected_id}).mappings().first()
+            row = dict(row) if row else None
+            st.session_state["table_editor_row"] = (row_key, row)
 
         if row:
             st.markdown("#### Edit Shift")
             with st.form(f"edit_shift_inline_{selected_id}"):
                 c1, c2 = st.columns(2)
                 with c1:
-                    prov_name_edit = st.selectbox("Provider", options=df_prov["provider_name"].tolist(),
-                                                  index=int(df_prov.index[df_prov["provider_id"]==row["provider_id"]][0]))
+                    prov_name_edit = st.selectbox("Provider", options=names.prov_options,
+                                                  index=names.prov_index.get(row["provider_id"], 0))
                 with c2:
-                    cli_name_edit = st.selectbox("Client", options=df_cli["client_name"].tolist(),
-                                                 index=int(df_cli.index[df_cli["client_id"]==row["client_id"]][0]))
+                    cli_name_edit = st.selectbox("Client", options=names.cli_options,
+                                                 index=names.cli_index.get(row["client_id"], 0))
 
-                start_val = pd.to_datetime(row["start_datetime"]).to_pydatetime()
-                end_val = pd.to_datetime(row["end_datetime"]).to_pydatetime()
+                start_val = row["start_datetime"]
+                end_val = row["end_datetime"]
+                is_24h_default = end_val - start_val == timedelta(hours=24)
 
                 c3, c4 = st.columns(2)
                 with c3:
                     start_date_edit = st.date_input("Start Date", value=start_val.date())
                     start_time_edit = st.time_input("Start Time", value=start_val.time())
                 with c4:
-                    is_24h_edit = st.checkbox("24-hour call shift", value=(end_val - start_val).total_seconds() == 24*3600)
+                    is_24h_edit = st.checkbox("24-hour call shift", value=is_24h_default)
                     end_date_edit = st.date_input("End Date", value=end_val.date(), disabled=is_24h_edit)
                     end_time_edit = st.time_input("End Time", value=end_val.time(), disabled=is_24h_edit)
 
@@ -979,12 +1077,13 @@ with tab_shifts_table:
             if delete:
                 with engine.begin() as conn:
                     delete_by_id(conn, shifts, "shift_id", selected_id)
+                bump_version("shifts")
                 st.success("Deleted shift.")
                 st.rerun()
 
             if save or dup:
-                new_prov_id = df_prov.loc[df_prov["provider_name"] == prov_name_edit, "provider_id"].iloc[0]
-                new_cli_id = df_cli.loc[df_cli["client_name"] == cli_name_edit, "client_id"].iloc[0]
+                new_prov_id = names.prov_id_by_name[prov_name_edit]
+                new_cli_id = names.cli_id_by_name[cli_name_edit]
                 start_dt_new = datetime.combine(start_date_edit, start_time_edit)
                 if is_24h_edit:
                     end_dt_new = start_dt_new + timedelta(hours=24)
@@ -1002,6 +1101,7 @@ with tab_shifts_table:
                 }
                 with engine.begin() as conn:
                     upsert(conn, shifts, new_row, key="shift_id")
+                bump_version("shifts")
                 st.success("Saved." if save else "Duplicated.")
                 st.rerun()
     else:
@@ -1020,9 +1120,9 @@ with tab_bulk:
         with st.form("bulk_add_shifts"):
             c1, c2 = st.columns(2)
             with c1:
-                prov_name_bulk = st.selectbox("Provider", options=df_prov["provider_name"].tolist(), key="bulk_provider")
+                prov_name_bulk = st.selectbox("Provider", options=names.prov_options, key="bulk_provider")
             with c2:
-                cli_name_bulk = st.selectbox("Client", options=df_cli["client_name"].tolist(), key="bulk_client")
+                cli_name_bulk = st.selectbox("Client", options=names.cli_options, key="bulk_client")
 
             c3, c4 = st.columns(2)
             with c3:
@@ -1048,39 +1148,42 @@ with tab_bulk:
 
             submitted_bulk = st.form_submit_button("Create shifts")
             if submitted_bulk:
-                created = 0
                 skipped = 0
-                prov_id_bulk = df_prov.loc[df_prov["provider_name"] == prov_name_bulk, "provider_id"].iloc[0]
-                cli_id_bulk = df_cli.loc[df_cli["client_name"] == cli_name_bulk, "client_id"].iloc[0]
+                prov_id_bulk = names.prov_id_by_name[prov_name_bulk]
+                cli_id_bulk = names.cli_id_by_name[cli_name_bulk]
                 # existing dates for this provider+client
-                existing_dates = set()
-                if not df_shifts.empty:
-                    mask = (df_shifts["provider_id"] == prov_id_bulk) & (df_shifts["client_id"] == cli_id_bulk)
-                    for _, r in df_shifts.loc[mask].iterrows():
-                        existing_dates.add(pd.to_datetime(r["start_datetime"]).date())
+                mask = (df_shifts["provider_id"] == prov_id_bulk) & (df_shifts["client_id"] == cli_id_bulk)
+                existing_dates = set(df_shifts.loc[mask, "start_datetime"].dt.date)
                 # iterate date range
-                d = pd.to_datetime(range_start).date()
-                end_d = pd.to_datetime(range_end).date()
+                d = range_start
+                end_d = range_end
                 weekdays_short = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
+                days_to_add = []
                 while d <= end_d:
                     if weekdays_short[d.weekday()] in wkdays:
                         if skip_existing and d in existing_dates:
                             skipped += 1
                         else:
-                            start_dt = datetime.combine(d, start_t_bulk)
-                            end_dt = start_dt + timedelta(hours=24) if is_24h_bulk else datetime.combine(d, end_t_bulk)
-                            with engine.begin() as conn:
-                                upsert(conn, shifts, {
-                                    "shift_id": generate_id("S"),
-                                    "provider_id": prov_id_bulk,
-                                    "client_id": cli_id_bulk,
-                                    "start_datetime": start_dt,
-                                    "end_datetime": end_dt,
-                                    "shift_type": shift_type_bulk,
-                                    "notes": notes_bulk,
-                                }, key="shift_id")
-                            created += 1
-                    d = d + pd.Timedelta(days=1)
+                            days_to_add.append(d)
+                    d = d + timedelta(days=1)
+                new_rows = []
+                for d, sid in zip(days_to_add, generate_ids("S", len(days_to_add))):
+                    start_dt = datetime.combine(d, start_t_bulk)
+                    end_dt = start_dt + timedelta(hours=24) if is_24h_bulk else datetime.combine(d, end_t_bulk)
+                    new_rows.append({
+                        "shift_id": sid,
+                        "provider_id": prov_id_bulk,
+                        "client_id": cli_id_bulk,
+                        "start_datetime": start_dt,
+                        "end_datetime": end_dt,
+                        "shift_type": shift_type_bulk,
+                        "notes": notes_bulk,
+                    })
+                # One transaction for the whole range instead of a commit per day
+                with engine.begin() as conn:
+                    bulk_upsert(conn, shifts, new_rows, key="shift_id")
+                bump_version("shifts")
+                created = len(new_rows)
                 st.success(f"Created {created} shifts. Skipped {skipped}.")
                 st.rerun()
 
@@ -1116,21 +1219,21 @@ with tab_providers:
                         "preferred_shift_end": parse_time(pend),
                         "preferred_days": pdays,
                     }, key="provider_id")
+                bump_version("providers")
                 st.success("Saved provider.")
                 st.rerun()
     st.markdown("### Current Providers")
-    with engine.begin() as conn:
-        st.dataframe(df_from_table(conn, providers), use_container_width=True, hide_index=True)
+    st.dataframe(load_table("providers", table_versions()["providers"]), use_container_width=True, hide_index=True)
 
 # Delete Provider
     st.markdown("### Delete Provider")
     if df_prov.empty:
         st.info("No providers to delete.")
     else:
-        prov_to_del = st.selectbox("Select provider to delete", options=df_prov["provider_name"].tolist(), key="del_prov_name")
+        prov_to_del = st.selectbox("Select provider to delete", options=names.prov_options, key="del_prov_name")
         cascade = st.checkbox("Also delete this provider's credentials and shifts", value=False, key="del_prov_cascade")
         if st.button("Delete provider", type="primary", key="del_prov_btn"):
-            pid = df_prov.loc[df_prov["provider_name"] == prov_to_del, "provider_id"].iloc[0]
+            pid = names.prov_id_by_name[prov_to_del]
             with engine.begin() as conn:
                 # Remove related rows if cascade selected
                 if cascade:
@@ -1144,6 +1247,7 @@ with tab_providers:
                         st.error("Provider has existing credentials or shifts. Enable 'Also delete…' to remove them, or clear them first.")
                         st.stop()
                 conn.execute(providers.delete().where(providers.c.provider_id == pid))
+            bump_version("providers", "credentials", "shifts")
             st.success(f"Deleted provider: {prov_to_del}")
             st.rerun()
 
@@ -1169,21 +1273,21 @@ with tab_clients:
                         "client_name": cname,
                         "location": loc,
                     }, key="client_id")
+                bump_version("clients")
                 st.success("Saved client.")
                 st.rerun()
     st.markdown("### Current Clients")
-    with engine.begin() as conn:
-        st.dataframe(df_from_table(conn, clients), use_container_width=True, hide_index=True)
+    st.dataframe(load_table("clients", table_versions()["clients"]), use_container_width=True, hide_index=True)
 
 # Delete Client
     st.markdown("### Delete Client")
     if df_cli.empty:
         st.info("No clients to delete.")
     else:
-        cli_to_del = st.selectbox("Select client to delete", options=df_cli["client_name"].tolist(), key="del_cli_name")
+        cli_to_del = st.selectbox("Select client to delete", options=names.cli_options, key="del_cli_name")
         cascade_cli = st.checkbox("Also delete this client's credentials and shifts", value=False, key="del_cli_cascade")
         if st.button("Delete client", type="primary", key="del_cli_btn"):
-            cid = df_cli.loc[df_cli["client_name"] == cli_to_del, "client_id"].iloc[0]
+            cid = names.cli_id_by_name[cli_to_del]
             with engine.begin() as conn:
                 if cascade_cli:
                     conn.execute(credentials.delete().where(credentials.c.client_id == cid))
@@ -1195,6 +1299,7 @@ with tab_clients:
                         st.error("Client has existing credentials or shifts. Enable 'Also delete…' to remove them, or clear them first.")
                         st.stop()
                 conn.execute(clients.delete().where(clients.c.client_id == cid))
+            bump_version("clients", "credentials", "shifts")
             st.success(f"Deleted client: {cli_to_del}")
             st.rerun()
 
@@ -1207,20 +1312,20 @@ with tab_credentials:
         with st.form("add_cred"):
             c1, c2 = st.columns(2)
             with c1:
-                prov_name = st.selectbox("Provider", options=df_prov["provider_name"].tolist())
-                provider_id = df_prov.loc[df_prov["provider_name"] == prov_name, "provider_id"].iloc[0]
+                prov_name = st.selectbox("Provider", options=names.prov_options)
+                provider_id = names.prov_id_by_name[prov_name]
             with c2:
-                cli_name = st.selectbox("Client", options=df_cli["client_name"].tolist())
-                client_id = df_cli.loc[df_cli["client_name"] == cli_name, "client_id"].iloc[0]
+                cli_name = st.selectbox("Client", options=names.cli_options)
+                client_id = names.cli_id_by_name[cli_name]
             submitted = st.form_submit_button("Add Credential")
             if submitted:
                 with engine.begin() as conn:
-                    conn.execute(credentials.insert().values(provider_id=provider_id, client_id=client_id))
+                    conn.execute(CREDENTIAL_INSERT_STMT, [{"provider_id": provider_id, "client_id": client_id}])
+                bump_version("credentials")
                 st.success("Credential added.")
                 st.rerun()
     st.markdown("### Current Credentials")
-    with engine.begin() as conn:
-        st.dataframe(df_from_table(conn, credentials), use_container_width=True, hide_index=True)
+    st.dataframe(load_table("credentials", table_versions()["credentials"]), use_container_width=True, hide_index=True)
 
 # Upload / Download
 with tab_io:
@@ -1241,16 +1346,27 @@ with tab_io:
 
     def handle_import(label: str, table: "Table", key_col: str | None = None):
         up = st.file_uploader(label, type=["csv"], key=f"up_{label}")
-        if up is not None:
-            df = pd.read_csv(up)
+        done_key = f"imported_{label}"
+        # The uploader keeps returning the same file on every rerun; only import it once
+        if up is not None and st.session_state.get(done_key) != up.file_id:
+            # Same DateTime-column discovery as df_from_table; shifts.csv gets its datetimes parsed in C
+            date_cols = [c.name for c in table.columns if isinstance(c.type, DateTime)]
+            df = pd.read_csv(up, parse_dates=date_cols or None)
+            # SQLite Time columns only accept time objects, not the "HH:MM" strings in the CSV
+            for col in (c.name for c in table.columns if isinstance(c.type, Time)):
+                if col in df:
+                    df[col] = df[col].map(parse_time)
             with engine.begin() as conn:
                 if key_col:
-                    for _, r in df.iterrows():
-                        upsert(conn, table, r.to_dict(), key=key_col)
+                    bulk_upsert(conn, table, df.to_dict(orient="records"), key=key_col)
                 else:
-                    conn.execute(table.insert(), df.to_dict(orient="records"))
-            st.success(f"Imported {len(df)} rows into {label}.")
+                    df.to_sql(table.name, conn, if_exists="append", index=False, method="multi", chunksize=1000)
+            bump_version(table.name)
+            st.session_state[done_key] = up.file_id
+            st.session_state[f"{done_key}_rows"] = len(df)
             st.rerun()
+        if up is not None and f"{done_key}_rows" in st.session_state:
+            st.success(f"Imported {st.session_state[f'{done_key}_rows']} rows into {label}.")
 
     c1, c2 = st.columns(2)
     with c1: